@@ -1,3 +1,14 @@
-from .app import app, create_app
+"""Flask app package; the app is only built on first access so app.asgi can run without Flask."""
 
 __all__ = ["app", "create_app"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        # Importing the .app submodule binds the package attribute "app" to that module,
+        # so the Flask object is assigned afterwards to replace it.
+        from .app import app, create_app
+
+        globals().update(app=app, create_app=create_app)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
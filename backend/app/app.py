@@ -1,7 +1,8 @@
-from flask import Flask
+from flask import Flask, Response
 from flask_cors import CORS
 
-from app.routes import chat_bp
+from app.routes import admin_bp, chat_bp
+from app.services.metrics import render_prometheus
 
 
 def create_app() -> Flask:
@@ -13,6 +14,10 @@ def create_app() -> Flask:
     def health():
         return {"status": "ok"}, 200
 
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
     @app.route("/", methods=["GET"])
     def index():
         return {
@@ -22,6 +27,7 @@ def create_app() -> Flask:
 
     # Register blueprints
     app.register_blueprint(chat_bp)
+    app.register_blueprint(admin_bp)
 
     return app
 
@@ -0,0 +1,120 @@
+"""
+ASGI entry point for the async chat path.
+
+Run (dependencies in requirements-asgi.txt):
+    uvicorn app.asgi:asgi_app --host 0.0.0.0 --port 8000 --workers 2
+
+POST /async/chat has the same contract as the Flask POST /chat, but an in-flight request is
+a coroutine on the worker's event loop rather than a held worker/thread: retrieval
+(encode + FAISS search) runs in a bounded thread pool, and the LLM call awaits a single
+AsyncOpenAI client created at startup, so upstream connections are reused across requests.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from app.services import metrics
+from app.services.llm_service import generate_response_async, make_async_client
+from app.services.pipeline_singleton import flag_enabled, get_pipeline
+
+# Bounded to roughly the core count: more threads would just contend for the same CPUs.
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", str(os.cpu_count() or 4)))
+_retrieval_pool = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval"
+)
+# Up to RETRIEVAL_WORKERS queries are in flight at once here, so micro-batching has
+# something to coalesce; it stays off by default for the sync Flask workers.
+BATCH_MAX_SIZE = int(os.getenv("RAG_BATCH_MAX_SIZE", "32"))
+_load_pipeline = functools.partial(get_pipeline, batch_max_size=BATCH_MAX_SIZE)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    try:
+        app.state.llm_client = make_async_client()
+    except RuntimeError as exc:  # no key yet: requests fail with 502 like the Flask route
+        print(f"AsyncOpenAI client not created: {exc}")
+        app.state.llm_client = None
+    yield
+    if app.state.llm_client is not None:
+        await app.state.llm_client.close()
+
+
+async def chat(request: Request) -> JSONResponse:
+    """Same contract as POST /chat, but retrieval is off-loop and the LLM call is awaited."""
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = {}
+    if not isinstance(payload, dict):
+        payload = {}
+    question = (payload.get("question") or "").strip()
+    history = payload.get("history") or []
+    persona = payload.get("persona") or None
+    if not question:
+        return JSONResponse({"error": "question is required"}, status_code=400)
+
+    metrics.inc("rag_requests_total", route="async_chat")
+    wants_timings = flag_enabled(payload.get("timings") or request.query_params.get("timings"))
+    loop = asyncio.get_running_loop()
+    with metrics.collect_timings(wants_timings) as timings:
+        try:
+            with metrics.timed("total"):
+                # First call loads the model; keep that off the loop as well.
+                pipeline = await loop.run_in_executor(_retrieval_pool, _load_pipeline)
+                # run_in_executor does not carry context over, so stage timings would be lost without this.
+                ctx = contextvars.copy_context()
+                context_text, hits = await loop.run_in_executor(
+                    _retrieval_pool, ctx.run, pipeline.retrieve, question
+                )
+                answer, model_used = await generate_response_async(
+                    context_text,
+                    question,
+                    history=history,
+                    persona=persona,
+                    client=request.app.state.llm_client,
+                )
+        except Exception as exc:  # fallback so frontend gets a friendly message
+            metrics.inc("rag_errors_total", stage="async_chat")
+            return JSONResponse({"error": str(exc)}, status_code=502)
+
+    body = {
+        "answer": answer,
+        "model": model_used,
+        "hits": hits,
+    }
+    if timings is not None:
+        body["timings"] = timings
+    return JSONResponse(body)
+
+
+async def health(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok"})
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+asgi_app = Starlette(
+    routes=[
+        Route("/async/chat", chat, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics_endpoint, methods=["GET"]),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan,
+)
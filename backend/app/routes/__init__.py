@@ -1,3 +1,4 @@
+from .admin_routes import admin_bp
 from .chat_routes import chat_bp
 
-__all__ = ["chat_bp"]
+__all__ = ["admin_bp", "chat_bp"]
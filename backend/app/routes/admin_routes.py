@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import hmac
+import os
+import threading
+
+from flask import Blueprint, jsonify, request
+
+from app.services.generations import INDEX_PATH_PINNED
+from app.services.pipeline_singleton import loaded_pipeline
+
+admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+# Admin endpoints stay disabled unless a token is configured.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+_reload_state = {"running": False, "last_error": None, "last_generation": None}
+_reload_state_lock = threading.Lock()
+
+
+def _authorized() -> bool:
+    supplied = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(supplied, ADMIN_TOKEN)
+
+
+def _reload_in_background(pipeline) -> None:
+    try:
+        generation = pipeline.reload_latest()
+        error = None
+    except Exception as exc:  # old generation keeps serving; surface the reason via GET
+        generation, error = None, str(exc)
+    with _reload_state_lock:
+        _reload_state["running"] = False
+        _reload_state["last_error"] = error
+        if generation is not None:
+            _reload_state["last_generation"] = generation
+
+
+@admin_bp.route("/reload", methods=["POST"])
+def reload_index():
+    """Load the generation named in vector_db/CURRENT in the background and swap it in."""
+    if not _authorized():
+        return jsonify({"error": "forbidden"}), 403
+    if INDEX_PATH_PINNED:
+        # RAG_INDEX_PATH takes precedence over CURRENT; restart to serve a new index.
+        return jsonify({"status": "pinned", "index_path": os.getenv("RAG_INDEX_PATH")}), 409
+    pipeline = loaded_pipeline()
+    if pipeline is None:
+        # Nothing loaded yet; the first chat request will pick up the current generation.
+        return jsonify({"status": "not_loaded"}), 200
+    with _reload_state_lock:
+        if _reload_state["running"]:
+            return jsonify({"status": "in_progress"}), 409
+        _reload_state["running"] = True
+    threading.Thread(target=_reload_in_background, args=(pipeline,), daemon=True).start()
+    return jsonify({"status": "started", "serving": pipeline.generation}), 202
+
+
+@admin_bp.route("/generation", methods=["GET"])
+def generation():
+    if not _authorized():
+        return jsonify({"error": "forbidden"}), 403
+    pipeline = loaded_pipeline()
+    with _reload_state_lock:
+        state = dict(_reload_state)
+    state["serving"] = pipeline.generation if pipeline is not None else None
+    return jsonify(state), 200
@@ -1,25 +1,16 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
-
 from flask import Blueprint, jsonify, request
 
-if TYPE_CHECKING:
-    from app.services.rag_pipeline import RagPipeline
+from app.services import metrics
+from app.services.pipeline_singleton import flag_enabled, get_pipeline
 
 chat_bp = Blueprint("chat", __name__)
 
-# Lazily initialized singletons to avoid reloading the model on each request.
-_pipeline = None
-
 
-def _get_pipeline() -> RagPipeline:
-    global _pipeline
-    if _pipeline is None:
-        # Heavy imports happen only when the first chat request arrives, keeping health checks snappy.
-        from app.services.rag_pipeline import RagPipeline
-        _pipeline = RagPipeline()
-    return _pipeline
+def _wants_timings(payload: dict) -> bool:
+    """Per-request stage timings are opt-in via `"timings": true` or `?timings=1`."""
+    return flag_enabled(payload.get("timings") or request.args.get("timings"))
 
 
 @chat_bp.route("/chat", methods=["POST"])
@@ -33,19 +24,24 @@ def chat():
     if not question:
         return jsonify({"error": "question is required"}), 400
 
-    pipeline = _get_pipeline()
-    try:
-        context_text, hits = pipeline.retrieve(question)
-        answer, model_used = generate_response(
-            context_text, question, history=history, persona=persona
-        )
-    except Exception as exc:  # fallback so frontend gets a friendly message
-        return jsonify({"error": str(exc)}), 502
-
-    return jsonify(
-        {
-            "answer": answer,
-            "model": model_used,
-            "hits": hits,
-        }
-    )
+    metrics.inc("rag_requests_total", route="chat")
+    with metrics.collect_timings(_wants_timings(payload)) as timings:
+        pipeline = get_pipeline()
+        try:
+            with metrics.timed("total"):
+                context_text, hits = pipeline.retrieve(question)
+                answer, model_used = generate_response(
+                    context_text, question, history=history, persona=persona
+                )
+        except Exception as exc:  # fallback so frontend gets a friendly message
+            metrics.inc("rag_errors_total", stage="chat")
+            return jsonify({"error": str(exc)}), 502
+
+    body = {
+        "answer": answer,
+        "model": model_used,
+        "hits": hits,
+    }
+    if timings is not None:
+        body["timings"] = timings
+    return jsonify(body)
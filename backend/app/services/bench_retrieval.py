@@ -0,0 +1,331 @@
+"""
+Retrieval benchmark: per-stage latency percentiles, QPS, memory, and recall@k.
+
+Usage:
+    # Real artifacts (vector_db/*) with the SentenceTransformer encoder
+    python -m app.services.bench_retrieval --out bench_results.json
+
+    # Synthetic corpus, approximate index candidate vs exact IndexFlatIP ground truth
+    python -m app.services.bench_retrieval --synthetic 1000000 --index-factory "IVF4096,Flat" --nprobe 16
+
+    # Regression check against an earlier run (exit code 1 on regression)
+    python -m app.services.bench_retrieval --compare bench_results.json
+
+What it does:
+    - Runs a query set through RagPipeline and records encode/search/hits/context latency.
+    - Measures single- and multi-threaded QPS and process memory.
+    - Computes recall@k of the serving index against exact inner-product search.
+    - Writes a JSON results file that later runs can be compared against.
+
+Synthetic mode skips the encoder (its cost does not depend on corpus size) and feeds
+query vectors straight into search, so 100k-10M vectors can be benchmarked without scraping.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List
+
+import faiss
+import numpy as np
+
+from . import metrics
+from .bench_utils import exact_top_k, generate_synthetic_corpus, percentiles, recall_at_k, synthetic_queries
+from .rag_pipeline import EMBED_PATH, RagPipeline
+from .sample_queries import DEFAULT_QUERIES
+
+STAGES = ("encode", "search", "hits", "context")
+# Metrics checked by --compare and whether bigger is better.
+REGRESSION_KEYS = {
+    "qps_single": True,
+    "qps_multi": True,
+    "recall_at_k": True,
+    "total_p95_ms": False,
+}
+
+
+class _VectorOnlyModel:
+    """Stand-in encoder for synthetic corpora, whose vectors have no source text."""
+
+    def encode(self, *args, **kwargs):
+        raise RuntimeError("Synthetic benchmarks search with query vectors directly.")
+
+
+def write_synthetic_corpus(out_dir: Path, n: int, dim: int = 384, seed: int = 0) -> None:
+    """Save a synthetic corpus in the vector_db layout so vector_store.build_index can consume it."""
+    vectors, meta = generate_synthetic_corpus(n, dim=dim, seed=seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    np.save(out_dir / "embeddings.npy", vectors)
+    meta.to_csv(out_dir / "meta_chunks.csv", index=False)
+    print(f"Saved synthetic corpus ({n} x {dim}) to {out_dir}")
+
+
+def build_candidate_index(vectors: np.ndarray, factory: str, nprobe: int | None = None) -> faiss.Index:
+    """Build an inner-product index from a faiss factory string (e.g. "IVF1024,Flat", "HNSW32")."""
+    index = faiss.index_factory(vectors.shape[1], factory, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(len(vectors), size=min(len(vectors), 100_000), replace=False)]
+        index.train(sample)
+    index.add(vectors)
+    if nprobe is not None:
+        faiss.ParameterSpace().set_index_parameter(index, "nprobe", nprobe)
+    return index
+
+
+def _rss_mb() -> float:
+    """Current resident set size (falls back to peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def _stage_latencies(run_one: Callable[[int], None], n: int) -> Dict[str, Dict[str, float]]:
+    """Run each query once with per-request timings on; return ms percentiles per stage."""
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES + ("total",)}
+    for i in range(n):
+        with metrics.collect_timings() as timings:
+            start = time.perf_counter()
+            run_one(i)
+            total = (time.perf_counter() - start) * 1000
+        for stage in STAGES:
+            if stage in timings:
+                samples[stage].append(timings[stage])
+        samples["total"].append(total)
+    return {stage: percentiles(vals) for stage, vals in samples.items() if vals}
+
+
+def _qps(run_one: Callable[[int], None], n: int, threads: int) -> float:
+    start = time.perf_counter()
+    if threads <= 1:
+        for i in range(n):
+            run_one(i)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(run_one, range(n)))
+    elapsed = time.perf_counter() - start
+    return n / elapsed if elapsed else 0.0
+
+
+def _load_queries(path: str | None, n: int) -> List[str]:
+    base: List[str] = DEFAULT_QUERIES
+    if path:
+        base = [line.strip() for line in Path(path).read_text(encoding="utf-8").splitlines() if line.strip()]
+    # Cycle the set up to n so percentiles have enough samples.
+    return [base[i % len(base)] for i in range(n)]
+
+
+def run_benchmark(
+    num_queries: int = 200,
+    top_k: int = 5,
+    threads: int = 8,
+    synthetic: int | None = None,
+    dim: int = 384,
+    index_factory: str | None = None,
+    nprobe: int | None = None,
+    queries_file: str | None = None,
+    recall_queries: int = 100,
+    batch_max_size: int = 1,
+) -> Dict[str, Any]:
+    rss_start = _rss_mb()
+    build_start = time.perf_counter()
+
+    # At 10M x 384 the corpus, the candidate index and an exact index are ~15 GB each, so
+    # never hold all three: ground truth is computed (and its index freed) before the
+    # candidate is built, and the raw vectors are dropped once the pipeline owns an index.
+    truth_ids = None
+    if synthetic:
+        vectors, meta = generate_synthetic_corpus(synthetic, dim=dim)
+        model = _VectorOnlyModel()
+        query_vecs = synthetic_queries(vectors, num_queries)
+        if index_factory:
+            truth_ids = exact_top_k(vectors, query_vecs[:recall_queries], top_k)
+    else:
+        vectors = np.load(EMBED_PATH).astype(np.float32)
+        faiss.normalize_L2(vectors)
+        meta = None
+        model = None
+
+    index = build_candidate_index(vectors, index_factory, nprobe) if index_factory else None
+    if synthetic and index is None:
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+
+    pipeline = RagPipeline(
+        top_k=top_k,
+        batch_max_size=batch_max_size,
+        model=model,
+        index=index,
+        meta=meta,
+    )
+    del index
+    build_s = time.perf_counter() - build_start
+
+    if not synthetic:
+        # Real queries need the encoder, which only exists once the pipeline does.
+        questions = _load_queries(queries_file, num_queries)
+        query_vecs = pipeline.encode(questions)
+        truth_ids = exact_top_k(vectors, query_vecs[:recall_queries], top_k)
+    del vectors
+    rss_loaded = _rss_mb()
+
+    if synthetic:
+
+        def run_one(i: int) -> None:
+            scores, idxs = pipeline.search_vectors(query_vecs[i : i + 1])
+            pipeline.build_hits(scores[0], idxs[0])
+
+        run_timed = run_one
+    else:
+
+        def run_timed(i: int) -> None:
+            # Direct path so each stage is attributed to this query, not a shared batch.
+            scores, idxs = pipeline.search_vectors(pipeline.encode([questions[i]]))
+            pipeline.build_hits(scores[0], idxs[0])
+
+        def run_one(i: int) -> None:
+            pipeline.retrieve(questions[i])
+
+    run_one(0)  # warm-up: first encode/search pays one-off allocation costs
+    stages = _stage_latencies(run_timed, num_queries)
+    qps_single = _qps(run_one, num_queries, threads=1)
+    qps_multi = _qps(run_one, num_queries, threads=threads)
+
+    _, cand_ids = pipeline.index.search(query_vecs[:recall_queries], top_k)
+    if truth_ids is None:
+        # A synthetic flat candidate already is exact inner-product search.
+        truth_ids = cand_ids
+    batching = pipeline.batch_stats()
+    pipeline.close()
+
+    return {
+        "config": {
+            "mode": "synthetic" if synthetic else "artifacts",
+            "vectors": int(pipeline.index.ntotal),
+            "dim": int(pipeline.index.d),
+            "top_k": top_k,
+            "num_queries": num_queries,
+            "threads": threads,
+            "index": index_factory or type(pipeline.index).__name__,
+            "nprobe": nprobe,
+            "batch_max_size": batch_max_size,
+            "python": platform.python_version(),
+            "faiss": getattr(faiss, "__version__", "unknown"),
+        },
+        "stages_ms": stages,
+        "total_p95_ms": stages["total"]["p95"],
+        "qps_single": qps_single,
+        "qps_multi": qps_multi,
+        "recall_at_k": recall_at_k(cand_ids, truth_ids),
+        "build_s": build_s,
+        "memory_mb": {
+            "rss_start": rss_start,
+            "rss_loaded": rss_loaded,
+            "peak": _peak_rss_mb(),
+        },
+        "batching": batching,
+    }
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    cfg = results["config"]
+    print(
+        f"\n{cfg['mode']} | {cfg['index']} | {cfg['vectors']} vectors x {cfg['dim']} | "
+        f"top_k {cfg['top_k']} | {cfg['num_queries']} queries"
+    )
+    print("Stage latency (ms):")
+    for stage, pct in results["stages_ms"].items():
+        print(f"  {stage:<8} " + "  ".join(f"{k} {v:8.3f}" for k, v in pct.items()))
+    print(f"QPS: single {results['qps_single']:.1f} | {cfg['threads']} threads {results['qps_multi']:.1f}")
+    print(f"recall@{cfg['top_k']} vs IndexFlatIP: {results['recall_at_k']:.4f}")
+    mem = results["memory_mb"]
+    print(
+        f"Memory (MB): start {mem['rss_start']:.0f} | loaded {mem['rss_loaded']:.0f} | peak {mem['peak']:.0f} "
+        f"| build {results['build_s']:.1f}s"
+    )
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return human-readable regressions beyond `tolerance` (fractional) vs the baseline run."""
+    regressions = []
+    for key, higher_is_better in REGRESSION_KEYS.items():
+        old, new = baseline.get(key), current.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = change < -tolerance if higher_is_better else change > tolerance
+        print(f"  {key:<14} {old:10.4f} -> {new:10.4f} ({change:+.1%})")
+        if worse:
+            regressions.append(f"{key} {change:+.1%}")
+    return regressions
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--num-queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--synthetic", type=int, default=None, help="generate N synthetic vectors")
+    parser.add_argument("--dim", type=int, default=384, help="synthetic vector dimension")
+    parser.add_argument("--index-factory", default=None, help="faiss factory string for the candidate index")
+    parser.add_argument("--nprobe", type=int, default=None)
+    parser.add_argument("--queries-file", default=None, help="one query per line (artifacts mode)")
+    parser.add_argument("--recall-queries", type=int, default=100)
+    parser.add_argument("--batch-max-size", type=int, default=1, help="RagPipeline micro-batching for QPS runs")
+    parser.add_argument("--out", default=None, help="write JSON results here")
+    parser.add_argument("--compare", default=None, help="baseline JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--write-synthetic", default=None, help="only save a synthetic corpus to this dir")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    if args.write_synthetic:
+        write_synthetic_corpus(Path(args.write_synthetic), args.synthetic or 100_000, dim=args.dim)
+        return 0
+
+    results = run_benchmark(
+        num_queries=args.num_queries,
+        top_k=args.top_k,
+        threads=args.threads,
+        synthetic=args.synthetic,
+        dim=args.dim,
+        index_factory=args.index_factory,
+        nprobe=args.nprobe,
+        queries_file=args.queries_file,
+        recall_queries=args.recall_queries,
+        batch_max_size=args.batch_max_size,
+    )
+    print_results(results)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Saved results to {args.out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(f"\nCompared with {args.compare}:")
+        regressions = compare_results(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions: " + ", ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
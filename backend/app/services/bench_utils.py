@@ -0,0 +1,99 @@
+"""
+Benchmark helpers shared by bench_retrieval and sharded_index.
+
+Only numpy/pandas/faiss: vectors-only benchmarks must not pull in the encoder (torch).
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Sequence
+
+import faiss
+import numpy as np
+import pandas as pd
+
+PERCENTILES = (50, 95, 99)
+
+
+def generate_synthetic_corpus(
+    n: int,
+    dim: int = 384,
+    n_clusters: int = 256,
+    noise: float = 0.35,
+    seed: int = 0,
+    chunk_rows: int = 100_000,
+) -> tuple[np.ndarray, pd.DataFrame]:
+    """
+    Clustered, L2-normalized float32 vectors plus minimal metadata rows.
+
+    Clusters make nearest-neighbour structure resemble real embeddings closely enough
+    for approximate indexes to show realistic recall. Rows are generated in chunks so
+    peak memory stays near the size of the output array.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, chunk_rows):
+        stop = min(start + chunk_rows, n)
+        labels = rng.integers(0, n_clusters, size=stop - start)
+        block = centers[labels] + noise * rng.standard_normal((stop - start, dim)).astype(np.float32)
+        faiss.normalize_L2(block)
+        vectors[start:stop] = block
+
+    ids = np.arange(n)
+    meta = pd.DataFrame(
+        {
+            "chunk_id": [f"{i}_0" for i in ids],
+            "title": "synthetic role",
+            "company": "synthetic co",
+            "chunk_text": [f"synthetic chunk {i}" for i in ids],
+        }
+    )
+    return vectors, meta
+
+
+def synthetic_queries(vectors: np.ndarray, n: int, noise: float = 0.1, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of random corpus rows, so every query has genuine near neighbours."""
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), size=n)]
+    queries = picks + noise * rng.standard_normal(picks.shape).astype(np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Ground-truth ids from exact inner-product search; the flat index is freed on return."""
+    truth_index = faiss.IndexFlatIP(vectors.shape[1])
+    truth_index.add(vectors)
+    _, ids = truth_index.search(queries, k)
+    return ids
+
+
+def percentiles(values: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99 of `values` (zeros when empty)."""
+    if not values:
+        return {f"p{p}": 0.0 for p in PERCENTILES}
+    arr = np.asarray(values, dtype=np.float64)
+    return {f"p{p}": float(np.percentile(arr, p)) for p in PERCENTILES}
+
+
+def recall_at_k(candidate: np.ndarray, truth: np.ndarray) -> float:
+    """Mean fraction of exact top-k ids that the candidate index also returned."""
+    found = 0
+    total = 0
+    for cand_row, true_row in zip(candidate, truth):
+        expected = {int(i) for i in true_row if i != -1}
+        found += len(expected & {int(i) for i in cand_row})
+        total += len(expected)
+    return found / total if total else 0.0
+
+
+__all__ = [
+    "PERCENTILES",
+    "exact_top_k",
+    "generate_synthetic_corpus",
+    "percentiles",
+    "recall_at_k",
+    "synthetic_queries",
+]
@@ -0,0 +1,256 @@
+"""
+Incremental offline build: scrape -> preprocess -> embed -> index -> publish.
+
+Usage:
+    python -m app.services.build_pipeline                 # rebuild whatever is stale
+    python -m app.services.build_pipeline --scrape        # also re-scrape the raw dataset
+    python -m app.services.build_pipeline --force embed   # rerun a stage; downstream follows if outputs change
+
+What it does:
+    - Fingerprints (sha256) each stage's inputs, outputs, and parameters into
+      vector_db/build_state.json.
+    - Skips a stage when its inputs and parameters match the last successful run and its
+      outputs are still the files that run produced.
+    - Re-encodes only chunks whose text changed in the embed stage (same model only).
+    - Writes every output atomically, then prints per-stage wall time and row counts.
+    - Publishes a new index generation (vector_db/generations/, CURRENT) that a running
+      server picks up via POST /admin/reload or INDEX_WATCH_INTERVAL.
+
+Paths resolve against --root (default: the backend/ directory), not the current directory.
+Scraping hits the network and has no upstream input to fingerprint, so it only runs on request.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .generations import CURRENT_FILENAME, VECTOR_DB_DIR
+from .io_utils import atomic_write, file_sha256
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+RAW_DATA_PATH = Path("dataset/raw/jobs_raw.csv")
+PROCESSED_PATH = Path("dataset/processed/jobs_cleaned.csv")
+EMBED_PATH = Path("vector_db/embeddings.npy")
+META_PATH = Path("vector_db/meta_chunks.csv")
+INDEX_PATH = Path("vector_db/faiss_index/index.faiss")
+STATE_PATH = Path("vector_db/build_state.json")
+STAGE_NAMES = ("scrape", "preprocess", "embed", "index", "publish")
+
+
+@dataclass
+class Stage:
+    name: str
+    inputs: List[Path]
+    outputs: List[Path]
+    params: Dict[str, Any]
+    # Runs the stage given the previous run's record (or None); returns rows produced.
+    run: Callable[[Optional[Dict[str, Any]]], int]
+
+
+@dataclass
+class StageReport:
+    name: str
+    status: str
+    seconds: float = 0.0
+    rows: Optional[int] = None
+
+
+@dataclass
+class BuildState:
+    """Persisted record of the last successful run of each stage plus a hash cache."""
+
+    path: Path
+    stages: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    files: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildState":
+        if not path.exists():
+            return cls(path)
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls(path, data.get("stages", {}), data.get("files", {}))
+
+    def save(self) -> None:
+        with atomic_write(self.path) as tmp:
+            tmp.write_text(
+                json.dumps({"stages": self.stages, "files": self.files}, indent=2, sort_keys=True),
+                encoding="utf-8",
+            )
+
+    def fingerprint(self, path: Path) -> Optional[str]:
+        """sha256 of a file, reusing the cached digest while size and mtime are unchanged."""
+        if not path.exists():
+            return None
+        stat = path.stat()
+        key = str(path)
+        cached = self.files.get(key)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha256"]
+        digest = file_sha256(path)
+        self.files[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+        return digest
+
+
+def _stale_reason(stage: Stage, state: BuildState, root: Path) -> Optional[str]:
+    record = state.stages.get(stage.name)
+    if record is None:
+        return "no previous run"
+    if record.get("params") != stage.params:
+        return "parameters changed"
+    for path in stage.inputs:
+        if state.fingerprint(path) != record["inputs"].get(str(path.relative_to(root))):
+            return f"input changed: {path.relative_to(root)}"
+    for path in stage.outputs:
+        current = state.fingerprint(path)
+        if current is None:
+            return f"output missing: {path.relative_to(root)}"
+        if current != record["outputs"].get(str(path.relative_to(root))):
+            return f"output modified: {path.relative_to(root)}"
+    return None
+
+
+def _record(stage: Stage, state: BuildState, root: Path, rows: int) -> None:
+    state.stages[stage.name] = {
+        "params": stage.params,
+        "inputs": {str(p.relative_to(root)): state.fingerprint(p) for p in stage.inputs},
+        "outputs": {str(p.relative_to(root)): state.fingerprint(p) for p in stage.outputs},
+        "rows": rows,
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def build_stages(
+    root: Path,
+    target_count: int = 300,
+    chunk_size: int = 500,
+    overlap: int = 50,
+    model_name: str = "all-MiniLM-L6-v2",
+) -> List[Stage]:
+    raw, processed = root / RAW_DATA_PATH, root / PROCESSED_PATH
+    embed, meta, index = root / EMBED_PATH, root / META_PATH, root / INDEX_PATH
+
+    # Stage modules are imported lazily so a no-op build never loads torch/faiss.
+    def scrape(_prev):
+        from .scraper import run_scraper
+        return len(run_scraper(str(raw), target_count=target_count))
+
+    def preprocess(_prev):
+        from .preprocessing import clean_and_chunk
+        return len(clean_and_chunk(raw, processed, chunk_size=chunk_size, overlap=overlap))
+
+    def embed_stage(prev):
+        from .embedding_service import generate_embeddings
+        # Cached vectors are only comparable if they came from the same model.
+        reuse = bool(prev) and prev.get("params", {}).get("model_name") == model_name
+        vectors, _ = generate_embeddings(processed, embed, meta, model_name=model_name, reuse_existing=reuse)
+        return int(vectors.shape[0])
+
+    def index_stage(_prev):
+        from .vector_store import build_index
+        return int(build_index(embed, index).ntotal)
+
+    def publish(_prev):
+        import pandas as pd
+
+        from .generations import publish_generation
+        publish_generation(index, meta, root / VECTOR_DB_DIR)
+        return len(pd.read_csv(meta))
+
+    return [
+        Stage("scrape", [], [raw], {"target_count": target_count}, scrape),
+        Stage("preprocess", [raw], [processed], {"chunk_size": chunk_size, "overlap": overlap}, preprocess),
+        Stage("embed", [processed], [embed, meta], {"model_name": model_name}, embed_stage),
+        Stage("index", [embed], [index], {}, index_stage),
+        Stage("publish", [index, meta], [root / VECTOR_DB_DIR / CURRENT_FILENAME], {}, publish),
+    ]
+
+
+def run_build(
+    root: Path = BACKEND_DIR,
+    scrape: bool = False,
+    force: Optional[List[str]] = None,
+    dry_run: bool = False,
+    **stage_params: Any,
+) -> List[StageReport]:
+    root = root.resolve()
+    state = BuildState.load(root / STATE_PATH)
+    forced = set(force or [])
+    reports: List[StageReport] = []
+    # In a dry run nothing is rebuilt, so fingerprints cannot show that a stage's outputs
+    # would change; once one stage would run, assume everything after it would too.
+    upstream_stale = False
+
+    for stage in build_stages(root, **stage_params):
+        if stage.name == "scrape" and not (scrape or "scrape" in forced):
+            reports.append(StageReport(stage.name, "skipped (not requested)"))
+            continue
+        if stage.name in forced:
+            reason = "forced"
+        elif stage.name == "scrape":
+            # Nothing upstream to fingerprint, so a requested scrape always runs.
+            reason = "requested"
+        elif dry_run and upstream_stale:
+            reason = "upstream stale"
+        else:
+            reason = _stale_reason(stage, state, root)
+        if reason is None:
+            rows = state.stages[stage.name].get("rows")
+            reports.append(StageReport(stage.name, "up to date", rows=rows))
+            continue
+        if dry_run:
+            upstream_stale = True
+            reports.append(StageReport(stage.name, f"would run ({reason})"))
+            continue
+
+        print(f"\n[{stage.name}] running: {reason}")
+        start = time.perf_counter()
+        rows = stage.run(state.stages.get(stage.name))
+        elapsed = time.perf_counter() - start
+        _record(stage, state, root, rows)
+        # Persist after every stage so an interrupted build resumes where it stopped.
+        state.save()
+        reports.append(StageReport(stage.name, f"ran ({reason})", elapsed, rows))
+
+    return reports
+
+
+def print_reports(reports: List[StageReport]) -> None:
+    print(f"\n{'Stage':<10} {'Time (s)':>10} {'Rows':>9}  Status")
+    for r in reports:
+        rows = "-" if r.rows is None else str(r.rows)
+        print(f"{r.name:<10} {r.seconds:>10.2f} {rows:>9}  {r.status}")
+    print(f"Total: {sum(r.seconds for r in reports):.2f}s")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--root", type=Path, default=BACKEND_DIR)
+    parser.add_argument("--scrape", action="store_true", help="re-scrape the raw dataset first")
+    parser.add_argument("--force", nargs="+", choices=STAGE_NAMES, default=[], help="rerun these stages")
+    parser.add_argument("--dry-run", action="store_true", help="report what would run")
+    parser.add_argument("--target-count", type=int, default=300)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--model-name", default="all-MiniLM-L6-v2")
+    args = parser.parse_args(argv)
+
+    reports = run_build(
+        root=args.root,
+        scrape=args.scrape,
+        force=args.force,
+        dry_run=args.dry_run,
+        target_count=args.target_count,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        model_name=args.model_name,
+    )
+    print_reports(reports)
+
+
+if __name__ == "__main__":
+    main()
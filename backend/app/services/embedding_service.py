@@ -1,33 +1,59 @@
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, Tuple
 
 import numpy as np
 import pandas as pd
 from sentence_transformers import SentenceTransformer
 
+from .io_utils import atomic_write
+
 PROCESSED_PATH = Path("dataset/processed/jobs_cleaned.csv")
 EMBED_PATH = Path("vector_db/embeddings.npy")
 META_PATH = Path("vector_db/meta_chunks.csv")
 
 
+def _load_cached_vectors(embed_path: Path, meta_path: Path) -> Dict[str, np.ndarray]:
+    """Map chunk_text -> vector from a previous run, if its artifacts line up."""
+    if not embed_path.exists() or not meta_path.exists():
+        return {}
+    vectors = np.load(embed_path)
+    meta = pd.read_csv(meta_path)
+    if len(meta) != len(vectors) or "chunk_text" not in meta:
+        return {}
+    return dict(zip(meta["chunk_text"].tolist(), vectors))
+
+
 def generate_embeddings(
     processed_path: Path = PROCESSED_PATH,
     embed_path: Path = EMBED_PATH,
     meta_path: Path = META_PATH,
     model_name: str = "all-MiniLM-L6-v2",
+    reuse_existing: bool = False,
 ) -> Tuple[np.ndarray, pd.DataFrame]:
+    """
+    Embed every chunk and save vectors + aligned metadata.
+
+    With reuse_existing, chunks whose text already has a vector in the current
+    embed/meta files are not re-encoded (only valid if they came from the same model).
+    """
     df = pd.read_csv(processed_path)
     if df.empty:
         raise ValueError("Processed dataset is empty; run preprocessing first.")
 
-    model = SentenceTransformer(model_name)
-    vectors = model.encode(
-        df["chunk_text"].tolist(), batch_size=64, show_progress_bar=True
-    )
-    vectors = np.array(vectors, dtype=np.float32)
+    texts = df["chunk_text"].tolist()
+    cached = _load_cached_vectors(embed_path, meta_path) if reuse_existing else {}
+    missing = [t for t in dict.fromkeys(texts) if t not in cached]
+    if missing:
+        model = SentenceTransformer(model_name)
+        new_vectors = model.encode(missing, batch_size=64, show_progress_bar=True)
+        cached.update(zip(missing, np.array(new_vectors, dtype=np.float32)))
+    vectors = np.array([cached[t] for t in texts], dtype=np.float32)
+    print(f"Encoded {len(missing)} new chunk texts ({len(texts)} rows total)")
 
-    np.save(embed_path, vectors)
-    df.to_csv(meta_path, index=False)
+    with atomic_write(embed_path) as tmp:
+        np.save(tmp, vectors)
+    with atomic_write(meta_path) as tmp:
+        df.to_csv(tmp, index=False)
 
     print(f"Saved embeddings to {embed_path} with shape {vectors.shape}")
     print(f"Saved metadata to {meta_path}")
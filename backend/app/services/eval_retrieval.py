@@ -19,14 +19,7 @@ from typing import Iterable, List
 import pandas as pd
 
 from .rag_pipeline import RagPipeline
-
-
-DEFAULT_QUERIES = [
-    "senior backend engineer python aws",
-    "frontend react typescript remote",
-    "data scientist machine learning",
-    "devops kubernetes terraform",
-]
+from .sample_queries import DEFAULT_QUERIES
 
 
 def keyword_precision(query: str, hits: List[dict]) -> float:
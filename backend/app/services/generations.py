@@ -0,0 +1,130 @@
+"""
+Versioned index generations for zero-downtime reloads.
+
+Layout (under vector_db/):
+    generations/<generation>/index.faiss
+    generations/<generation>/meta_chunks.csv
+    CURRENT                      # name of the generation the server should serve
+
+A generation directory is complete before it becomes visible (built under a temp
+name, then renamed), and CURRENT is swapped atomically, so a reader never observes
+a half-written generation.
+
+Generations hold single-file indexes. An explicit RAG_INDEX_PATH (e.g. a shard directory,
+see sharded_index.py) wins over CURRENT: the server then loads exactly that path and
+ignores published generations, both at startup and on reload.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from .io_utils import atomic_write
+
+if TYPE_CHECKING:
+    from .rag_pipeline import RagPipeline
+
+VECTOR_DB_DIR = Path("vector_db")
+GENERATIONS_DIRNAME = "generations"
+CURRENT_FILENAME = "CURRENT"
+INDEX_FILENAME = "index.faiss"
+META_FILENAME = "meta_chunks.csv"
+INDEX_PATH_PINNED = bool(os.getenv("RAG_INDEX_PATH"))
+
+
+def generation_paths(generation: str, root: Path = VECTOR_DB_DIR) -> Tuple[Path, Path]:
+    base = root / GENERATIONS_DIRNAME / generation
+    return base / INDEX_FILENAME, base / META_FILENAME
+
+
+def current_generation(root: Path = VECTOR_DB_DIR) -> Optional[str]:
+    pointer = root / CURRENT_FILENAME
+    if not pointer.exists():
+        return None
+    name = pointer.read_text(encoding="utf-8").strip()
+    return name or None
+
+
+def resolve_paths(
+    root: Path, default_index: Path, default_meta: Path, pinned: bool = INDEX_PATH_PINNED
+) -> Tuple[Path, Path, Optional[str]]:
+    """Paths of the current generation, or the defaults if none was published or the index path is pinned."""
+    generation = None if pinned else current_generation(root)
+    if generation is None:
+        return default_index, default_meta, None
+    index_path, meta_path = generation_paths(generation, root)
+    return index_path, meta_path, generation
+
+
+def publish_generation(
+    index_path: Path,
+    meta_path: Path,
+    root: Path = VECTOR_DB_DIR,
+    keep: int = 3,
+) -> str:
+    """Copy a built index + metadata into a new generation and point CURRENT at it."""
+    generation = datetime.now().strftime("%Y%m%dT%H%M%S-%f")
+    gens_dir = root / GENERATIONS_DIRNAME
+    staging = gens_dir / f".{generation}.tmp"
+    staging.mkdir(parents=True)
+    try:
+        shutil.copy2(index_path, staging / INDEX_FILENAME)
+        shutil.copy2(meta_path, staging / META_FILENAME)
+        staging.rename(gens_dir / generation)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    with atomic_write(root / CURRENT_FILENAME) as tmp:
+        tmp.write_text(generation + "\n", encoding="utf-8")
+    print(f"Published generation {generation} to {gens_dir}")
+    prune_generations(root, keep=keep)
+    return generation
+
+
+def prune_generations(root: Path = VECTOR_DB_DIR, keep: int = 3) -> None:
+    """Drop all but the newest `keep` generations; the current one is never removed.
+
+    Safe while serving: a loaded pipeline holds its index and metadata in memory.
+    """
+    gens_dir = root / GENERATIONS_DIRNAME
+    if not gens_dir.exists():
+        return
+    current = current_generation(root)
+    names = sorted(p.name for p in gens_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for name in names[:-keep] if keep > 0 else names:
+        if name != current:
+            shutil.rmtree(gens_dir / name, ignore_errors=True)
+
+
+def start_watcher(pipeline: "RagPipeline", root: Path = VECTOR_DB_DIR, interval: float = 30.0) -> threading.Thread:
+    """Poll CURRENT and hot-reload the pipeline whenever it names a new generation."""
+
+    def _watch() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                pipeline.reload_latest(root)
+            except Exception as exc:  # keep serving the old generation; retry next tick
+                print(f"Index reload failed: {exc}")
+
+    thread = threading.Thread(target=_watch, name="index-watcher", daemon=True)
+    thread.start()
+    return thread
+
+
+__all__ = [
+    "INDEX_PATH_PINNED",
+    "current_generation",
+    "generation_paths",
+    "prune_generations",
+    "publish_generation",
+    "resolve_paths",
+    "start_watcher",
+]
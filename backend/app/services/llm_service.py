@@ -3,8 +3,12 @@ from typing import List, Tuple, Dict
 
 import openai
 
+from . import metrics
+
 # Default ChatGPT model; override via OPENAI_MODEL.
 DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# Client-side retries on connection errors, 429s and 5xx (the SDK's own default is 2).
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
 
 PERSONA_PRESETS = {
     "concise_career_coach": "You are a concise career coach. Give short, actionable answers in bullet points.",
@@ -26,25 +30,13 @@ def _format_history(history: List[Dict[str, str]]) -> List[Dict[str, str]]:
     return messages[-8:]
 
 
-def generate_response(
+def _build_messages(
     context: str,
     question: str,
     history: List[Dict[str, str]] | None = None,
     persona: str | None = None,
-    model: str | None = None,
-) -> Tuple[str, str]:
-    """
-    Given retrieved context and user question, produce a grounded answer using OpenAI Chat Completions.
-
-    Returns:
-        answer (str), used_model (str)
-    """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY not set in environment.")
-
-    client = openai.OpenAI(api_key=api_key)
-    model_name = model or DEFAULT_MODEL
+) -> List[Dict[str, str]]:
+    """Assemble the system prompt, trimmed history, and grounded user turn."""
     persona_text = PERSONA_PRESETS.get(persona or "", PERSONA_PRESETS["concise_career_coach"])
     messages = [
         {
@@ -65,18 +57,99 @@ def generate_response(
             "content": f"Context:\n{context}\n\nQuestion:\n{question}",
         }
     )
+    return messages
 
+
+def _record_usage(resp) -> None:
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return
+    metrics.inc("rag_llm_tokens_total", usage.prompt_tokens or 0, kind="prompt")
+    metrics.inc("rag_llm_tokens_total", usage.completion_tokens or 0, kind="completion")
+
+
+def _require_api_key() -> str:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY not set in environment.")
+    return api_key
+
+
+def generate_response(
+    context: str,
+    question: str,
+    history: List[Dict[str, str]] | None = None,
+    persona: str | None = None,
+    model: str | None = None,
+) -> Tuple[str, str]:
+    """
+    Given retrieved context and user question, produce a grounded answer using OpenAI Chat Completions.
+
+    Returns:
+        answer (str), used_model (str)
+    """
+    client = openai.OpenAI(api_key=_require_api_key(), max_retries=MAX_RETRIES)
+    model_name = model or DEFAULT_MODEL
+    messages = _build_messages(context, question, history=history, persona=persona)
+
+    try:
+        with metrics.timed("llm"):
+            resp = client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                temperature=0.2,
+            )
+        _record_usage(resp)
+        answer = (resp.choices[0].message.content or "").strip()
+    except Exception as exc:
+        metrics.inc("rag_errors_total", stage="llm")
+        answer = f"LLM error: {exc}"
+
+    return answer, model_name
+
+
+def make_async_client() -> openai.AsyncOpenAI:
+    """AsyncOpenAI client meant to be created once per event loop and shared across requests."""
+    return openai.AsyncOpenAI(api_key=_require_api_key(), max_retries=MAX_RETRIES)
+
+
+async def generate_response_async(
+    context: str,
+    question: str,
+    history: List[Dict[str, str]] | None = None,
+    persona: str | None = None,
+    model: str | None = None,
+    client: openai.AsyncOpenAI | None = None,
+) -> Tuple[str, str]:
+    """
+    Async counterpart of generate_response using the AsyncOpenAI client.
+
+    Waiting on the upstream completion yields the event loop instead of blocking a thread.
+    Pass a long-lived `client` so its connection pool is reused; without one, a client is
+    created (and closed) for this call only.
+    """
+    if client is None:
+        async with make_async_client() as own_client:
+            return await generate_response_async(
+                context, question, history=history, persona=persona, model=model, client=own_client
+            )
+
+    model_name = model or DEFAULT_MODEL
+    messages = _build_messages(context, question, history=history, persona=persona)
     try:
-        resp = client.chat.completions.create(
-            model=model_name,
-            messages=messages,
-            temperature=0.2,
-        )
+        with metrics.timed("llm"):
+            resp = await client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                temperature=0.2,
+            )
+        _record_usage(resp)
         answer = (resp.choices[0].message.content or "").strip()
     except Exception as exc:
+        metrics.inc("rag_errors_total", stage="llm")
         answer = f"LLM error: {exc}"
 
     return answer, model_name
 
 
-__all__ = ["generate_response"]
+__all__ = ["generate_response", "generate_response_async", "make_async_client"]
@@ -0,0 +1,379 @@
+"""
+End-to-end load test for the chat endpoints against a local mock LLM.
+
+Usage:
+    # Sync Flask /chat (gunicorn) vs ASGI /async/chat (uvicorn), same worker count, slow upstream
+    python -m app.services.load_test --workers 2 --concurrency 8 64 --requests 256 --llm-latency 2.0
+
+    # Evaluate another server configuration for one stack
+    python -m app.services.load_test --targets flask \
+        --flask-cmd "gunicorn -w 4 -k gthread --threads 32 -b 127.0.0.1:{port} app:app"
+
+    # Only run the mock LLM (point OPENAI_BASE_URL of a separately started app at it)
+    python -m app.services.load_test --mock-only --llm-port 8765
+
+What it does:
+    - Starts an OpenAI-compatible stand-in for /v1/chat/completions with configurable
+      time-to-first-token, token rate, completion length, error rate, and SSE streaming.
+    - Launches each target server as a subprocess with the OpenAI clients pointed at it
+      (server packages: requirements-asgi.txt).
+    - Drives each target at fixed concurrency levels and reports throughput, the latency
+      distribution, and error rates (HTTP failures and swallowed "LLM error:" answers).
+    - Reports the upstream (mock) error rate next to the app-visible one. The servers get
+      OPENAI_MAX_RETRIES=0 by default so the two match; pass --llm-max-retries to see
+      how much client retries hide at the cost of latency.
+
+Retrieval still runs against the real index and SentenceTransformer, so run it from backend/.
+No OpenAI key is needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shlex
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .sample_queries import DEFAULT_QUERIES
+
+DEFAULT_QUESTION = "python developer with cloud and devops experience"
+
+
+class MockLLMConfig:
+    """Knobs for the mock upstream; shared by all handler threads."""
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        jitter: float = 0.0,
+        token_rate: float = 0.0,
+        completion_tokens: int = 60,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        # Tokens per second after the first token; 0 means the whole completion arrives at once.
+        self.token_rate = token_rate
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._lock = threading.Lock()
+        self.served = Counter()
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self.served[outcome] += 1
+
+    def take_served(self) -> Counter:
+        """Outcomes since the last call, resetting the count."""
+        with self._lock:
+            served, self.served = self.served, Counter()
+        return served
+
+
+class _MockLLMHandler(BaseHTTPRequestHandler):
+    """Answers /v1/chat/completions like OpenAI, including `stream: true` SSE responses."""
+
+    config: MockLLMConfig = MockLLMConfig()
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # noqa: N802 - http.server naming
+        cfg = self.config
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        model = body.get("model", "mock")
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+
+        time.sleep(max(cfg.latency + random.uniform(-cfg.jitter, cfg.jitter), 0.0))
+        if random.random() < cfg.error_rate:
+            cfg.count("error")
+            self._send_json(
+                cfg.error_status,
+                {"error": {"message": "mock upstream failure", "type": "server_error", "code": None}},
+            )
+            return
+
+        tokens = ["- mock"] + [" token"] * max(cfg.completion_tokens - 1, 0)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+        if body.get("stream"):
+            self._stream(model, tokens, usage)
+        else:
+            if cfg.token_rate > 0:
+                time.sleep(len(tokens) / cfg.token_rate)
+            self._send_json(
+                200,
+                {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "".join(tokens)},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                },
+            )
+        cfg.count("ok")
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, model: str, tokens: List[str], usage: Dict[str, int]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        delay = 1.0 / self.config.token_rate if self.config.token_rate > 0 else 0.0
+        base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        for i, tok in enumerate(tokens):
+            delta = {"role": "assistant", "content": tok} if i == 0 else {"content": tok}
+            chunk = dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if delay:
+                time.sleep(delay)
+        final = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}], usage=usage)
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.wfile.flush()
+        self.close_connection = True
+
+    def log_message(self, format, *args):  # keep load test output readable
+        pass
+
+
+def start_mock_llm(port: int, config: MockLLMConfig) -> ThreadingHTTPServer:
+    handler = type("MockLLMHandler", (_MockLLMHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Each target: server command ({port}/{workers} substituted) and the chat path it serves.
+DEFAULT_TARGETS = {
+    "flask": ("gunicorn -w {workers} -b 127.0.0.1:{port} app:app", "/chat"),
+    "asgi": ("uvicorn app.asgi:asgi_app --host 127.0.0.1 --port {port} --workers {workers}", "/async/chat"),
+}
+
+
+def start_app_process(cmd: str, port: int, workers: int, env: Dict[str, str]) -> subprocess.Popen:
+    """Launch the app with a server command; `{port}` and `{workers}` are substituted."""
+    proc = subprocess.Popen(shlex.split(cmd.format(port=port, workers=workers)), env=env)
+    try:
+        _wait_for(f"http://127.0.0.1:{port}/health", timeout=120)
+    except Exception:
+        proc.terminate()
+        raise
+    return proc
+
+
+def _wait_for(url: str, timeout: float) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except Exception:
+            time.sleep(0.5)
+    raise RuntimeError(f"App did not become healthy at {url} within {timeout:.0f}s")
+
+
+def _post(url: str, question: str, timeout: float) -> Dict[str, Any]:
+    data = json.dumps({"question": question}).encode("utf-8")
+    req = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}, method="POST"
+    )
+    start = time.perf_counter()
+    llm_error = False
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = json.loads(resp.read() or b"{}")
+            status = resp.status
+        # generate_response swallows upstream failures into the answer text.
+        llm_error = str(body.get("answer", "")).startswith("LLM error:")
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except Exception:
+        status = 0
+    return {"status": status, "latency": time.perf_counter() - start, "llm_error": llm_error}
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[k]
+
+
+def run_load(
+    url: str,
+    concurrency: int,
+    total_requests: int,
+    questions: List[str] | None = None,
+    timeout: float = 120.0,
+) -> Dict[str, Any]:
+    """Drive `total_requests` POSTs at `url` with `concurrency` in flight; return a summary."""
+    questions = questions or [DEFAULT_QUESTION]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(
+            pool.map(
+                lambda i: _post(url, questions[i % len(questions)], timeout),
+                range(total_requests),
+            )
+        )
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r["status"] == 200 and not r["llm_error"]]
+    latencies = [r["latency"] for r in ok]
+    statuses = Counter(r["status"] for r in results)
+    llm_errors = sum(1 for r in results if r["llm_error"])
+    failed = total_requests - len(ok)
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "mean_s": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_s": _percentile(latencies, 50),
+        "p90_s": _percentile(latencies, 90),
+        "p95_s": _percentile(latencies, 95),
+        "p99_s": _percentile(latencies, 99),
+        "max_s": max(latencies, default=0.0),
+        "errors": failed,
+        "error_rate": failed / total_requests if total_requests else 0.0,
+        "llm_errors": llm_errors,
+        "status_counts": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def add_upstream_stats(summary: Dict[str, Any], served: Counter) -> None:
+    """Attach what the mock LLM saw during the run, retries included."""
+    calls = sum(served.values())
+    summary["upstream_calls"] = calls
+    summary["upstream_errors"] = served["error"]
+    summary["upstream_error_rate"] = served["error"] / calls if calls else 0.0
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    print(
+        f"{summary['url']}: {summary['requests']} req @ c={summary['concurrency']} | "
+        f"{summary['throughput_rps']:.1f} ok req/s | "
+        f"p50 {summary['p50_s']:.3f}s p90 {summary['p90_s']:.3f}s p95 {summary['p95_s']:.3f}s "
+        f"p99 {summary['p99_s']:.3f}s max {summary['max_s']:.3f}s | "
+        f"errors {summary['errors']} ({summary['error_rate']:.1%}, llm {summary['llm_errors']}) "
+        f"| status {summary['status_counts']}"
+    )
+    if "upstream_calls" in summary:
+        print(
+            f"    upstream: {summary['upstream_calls']} calls, "
+            f"error rate {summary['upstream_error_rate']:.1%} vs app-visible {summary['error_rate']:.1%}"
+        )
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[64], help="one run per level")
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="seconds to first token")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="+/- seconds added to latency")
+    parser.add_argument("--llm-token-rate", type=float, default=0.0, help="tokens/s after first token (0 = instant)")
+    parser.add_argument("--llm-tokens", type=int, default=60, help="completion length in tokens")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument("--llm-error-status", type=int, default=500)
+    parser.add_argument(
+        "--llm-max-retries", type=int, default=0, help="OPENAI_MAX_RETRIES for the servers under test"
+    )
+    parser.add_argument("--llm-port", type=int, default=8765)
+    parser.add_argument("--app-port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, default=2, help="server processes per target")
+    parser.add_argument("--targets", nargs="+", choices=sorted(DEFAULT_TARGETS), default=["flask", "asgi"])
+    parser.add_argument("--flask-cmd", default=DEFAULT_TARGETS["flask"][0])
+    parser.add_argument("--asgi-cmd", default=DEFAULT_TARGETS["asgi"][0])
+    parser.add_argument("--mock-only", action="store_true", help="run only the mock LLM until interrupted")
+    parser.add_argument("--out", default=None, help="write JSON summaries here")
+    args = parser.parse_args(argv)
+
+    config = MockLLMConfig(
+        latency=args.llm_latency,
+        jitter=args.llm_jitter,
+        token_rate=args.llm_token_rate,
+        completion_tokens=args.llm_tokens,
+        error_rate=args.llm_error_rate,
+        error_status=args.llm_error_status,
+    )
+    start_mock_llm(args.llm_port, config)
+    llm_url = f"http://127.0.0.1:{args.llm_port}/v1"
+    if args.mock_only:
+        print(f"Mock LLM listening at {llm_url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return
+
+    # Both the sync and async OpenAI clients pick these up from the environment.
+    env = dict(os.environ)
+    env["OPENAI_BASE_URL"] = llm_url
+    env.setdefault("OPENAI_API_KEY", "sk-mock")
+    env["OPENAI_MAX_RETRIES"] = str(args.llm_max_retries)
+    commands = {"flask": args.flask_cmd, "asgi": args.asgi_cmd}
+
+    summaries = []
+    for offset, target in enumerate(args.targets):
+        port = args.app_port + offset
+        path = DEFAULT_TARGETS[target][1]
+        url = f"http://127.0.0.1:{port}{path}"
+        proc = start_app_process(commands[target], port, args.workers, env)
+        try:
+            # Each worker process loads its own model + index; warm them all before measuring.
+            run_load(url, args.workers * 2, args.workers * 4, [DEFAULT_QUESTION], timeout=600)
+            for concurrency in args.concurrency:
+                config.take_served()
+                summary = run_load(url, concurrency, args.requests, DEFAULT_QUERIES, timeout=args.timeout)
+                add_upstream_stats(summary, config.take_served())
+                summary["target"] = target
+                print_summary(summary)
+                summaries.append(summary)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    if args.out:
+        Path(args.out).write_text(
+            json.dumps({"config": vars(args), "runs": summaries}, indent=2), encoding="utf-8"
+        )
+        print(f"Saved results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Lightweight in-process metrics for the chat hot path.
+
+Stages are timed with `timed("encode")` etc.; observations land in Prometheus-style
+histograms rendered by `render_prometheus()` for GET /metrics. When a request opts in
+via `collect_timings()`, the same measurements are also gathered per request (in ms).
+
+Set METRICS_ENABLED=0 to skip histogram/counter updates entirely.
+
+The registry is per process. Under multi-worker gunicorn/uvicorn each scrape of /metrics
+is answered by whichever worker the request lands on, so every sample carries a
+`worker` label (the pid): series from different workers never overwrite each other,
+and fleet totals come from aggregating it away, e.g. `sum without (worker) (...)`.
+A scrape only sees one worker, so a worker's series update on the scrapes it answers.
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in {"0", "false", "no"}
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+_HELP = {
+    "rag_stage_latency_seconds": ("histogram", "Latency of chat hot-path stages."),
+    "rag_query_batch_size": ("histogram", "Queries per micro-batched encode/search."),
+    "rag_llm_tokens_total": ("counter", "LLM tokens consumed, by kind."),
+    "rag_requests_total": ("counter", "Chat requests handled, by route."),
+    "rag_errors_total": ("counter", "Errors on the chat path, by stage."),
+    "rag_reloads_total": ("counter", "Index generation reloads, by result."),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Thread-safe store of labelled histograms and counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(buckets)
+            hist.observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self, const_labels: Labels = ()) -> str:
+        """Prometheus text exposition format (version 0.0.4); `const_labels` go on every sample."""
+        with self._lock:
+            histograms = {k: (h.buckets, list(h.counts), h.sum, h.count) for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines: List[str] = []
+        seen = set()
+
+        def header(name: str) -> None:
+            if name in seen:
+                return
+            seen.add(name)
+            kind, text = _HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            header(name)
+            labels = labels + const_labels
+            cumulative = 0
+            for bound, n in zip(buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_fmt_labels(labels, le=_fmt_value(bound))} {cumulative}")
+            lines.append(f"{name}_bucket{_fmt_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name)
+            labels = labels + const_labels
+            lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _fmt_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _fmt_labels(labels: Labels, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time a hot-path stage into the latency histogram and any active per-request timings."""
+    timings = _request_timings.get()
+    if not METRICS_ENABLED and timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if METRICS_ENABLED:
+            REGISTRY.observe("rag_stage_latency_seconds", elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+
+@contextmanager
+def collect_timings(enabled: bool = True) -> Iterator[Optional[Dict[str, float]]]:
+    """Gather per-stage milliseconds for the current request (None when disabled)."""
+    token = _request_timings.set({} if enabled else None)
+    try:
+        yield _request_timings.get()
+    finally:
+        _request_timings.reset(token)
+
+
+def add_timings(stage_ms: Dict[str, float]) -> None:
+    """Credit stages measured elsewhere (e.g. on the batcher thread) to the current request."""
+    timings = _request_timings.get()
+    if timings is None:
+        return
+    for stage, ms in stage_ms.items():
+        timings[stage] = timings.get(stage, 0.0) + ms
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels: str) -> None:
+    if METRICS_ENABLED:
+        REGISTRY.observe(name, value, buckets=buckets, **labels)
+
+
+def inc(name: str, amount: float = 1.0, **labels: str) -> None:
+    if METRICS_ENABLED:
+        REGISTRY.inc(name, amount, **labels)
+
+
+def render_prometheus() -> str:
+    # Read at render time: workers fork after this module is imported.
+    return REGISTRY.render((("worker", str(os.getpid())),))
+
+
+__all__ = [
+    "METRICS_ENABLED",
+    "REGISTRY",
+    "add_timings",
+    "collect_timings",
+    "inc",
+    "observe",
+    "render_prometheus",
+    "timed",
+]
@@ -0,0 +1,53 @@
+"""
+Process-wide RagPipeline shared by the Flask blueprints and the ASGI app.
+
+Kept free of web-framework imports so either server can use it without loading the other.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .rag_pipeline import RagPipeline
+
+# Lazily initialized singleton to avoid reloading the model on each request.
+_pipeline = None
+_pipeline_lock = threading.Lock()
+# Seconds between checks of vector_db/CURRENT for a new index generation; 0 disables.
+INDEX_WATCH_INTERVAL = float(os.getenv("INDEX_WATCH_INTERVAL", "0"))
+
+
+def get_pipeline(**options) -> RagPipeline:
+    """The shared pipeline; `options` (RagPipeline kwargs) only apply to the call that creates it."""
+    global _pipeline
+    if _pipeline is None:
+        # Concurrent first requests must not each load their own model copy.
+        with _pipeline_lock:
+            if _pipeline is None:
+                # Heavy imports happen only when the first chat request arrives, keeping health checks snappy.
+                from .generations import INDEX_PATH_PINNED, VECTOR_DB_DIR, resolve_paths, start_watcher
+                from .rag_pipeline import INDEX_PATH, META_PATH, RagPipeline
+                # An explicit RAG_INDEX_PATH wins over vector_db/CURRENT (see generations.py).
+                index_path, meta_path, generation = resolve_paths(VECTOR_DB_DIR, INDEX_PATH, META_PATH)
+                _pipeline = RagPipeline(
+                    index_path=index_path, meta_path=meta_path, generation=generation, **options
+                )
+                if INDEX_WATCH_INTERVAL > 0 and not INDEX_PATH_PINNED:
+                    start_watcher(_pipeline, VECTOR_DB_DIR, INDEX_WATCH_INTERVAL)
+    return _pipeline
+
+
+def loaded_pipeline() -> RagPipeline | None:
+    """The pipeline if a request already created it, without triggering a load."""
+    return _pipeline
+
+
+def flag_enabled(value) -> bool:
+    """Truthiness of a JSON/query-string flag such as `timings`."""
+    return str(value).lower() in {"1", "true", "yes"}
+
+
+__all__ = ["INDEX_WATCH_INTERVAL", "flag_enabled", "get_pipeline", "loaded_pipeline"]
@@ -6,6 +6,8 @@ from typing import List
 import pandas as pd
 from bs4 import BeautifulSoup
 
+from .io_utils import atomic_write
+
 RAW_DATA_PATH = Path("dataset/raw/jobs_raw.csv")
 PROCESSED_PATH = Path("dataset/processed/jobs_cleaned.csv")
 
@@ -55,6 +57,9 @@ def clean_and_chunk(
     df["location"] = df["location"].fillna("").astype(str).str.strip()
     df["skills"] = df["skills"].fillna("").astype(str).str.lower()
     df["description_clean"] = df["description"].fillna("").astype(str).apply(strip_html)
+    # Provenance is kept so hits can link back and indexes can be sharded by source.
+    df["source"] = df["source"].fillna("").astype(str).str.strip()
+    df["url"] = df["url"].fillna("").astype(str).str.strip()
 
     # Remove duplicates on core identifying fields
     df = df.drop_duplicates(subset=["title", "company", "description_clean"])
@@ -83,11 +88,14 @@ def clean_and_chunk(
                     "description_clean": row["description_clean"],
                     "document": row["document"],
                     "chunk_text": chunk,
+                    "source": row["source"],
+                    "url": row["url"],
                 }
             )
 
     processed_df = pd.DataFrame.from_records(records)
-    processed_df.to_csv(output_path, index=False)
+    with atomic_write(output_path) as tmp:
+        processed_df.to_csv(tmp, index=False)
     print(f"Processed rows: {len(processed_df)} saved to {output_path}")
     return processed_df
 
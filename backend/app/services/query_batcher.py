@@ -0,0 +1,139 @@
+"""
+Dynamic micro-batching for query encode + FAISS search.
+
+Concurrent callers submit single questions; a background thread gathers whatever
+arrives within `max_wait_ms` (or until `max_batch_size` is reached), runs one
+batched search, and hands each caller its own entry of the result.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from . import metrics
+
+# Takes a batch of questions, returns one result per question in the same order.
+SearchFn = Callable[[Sequence[str]], Sequence[Any]]
+# Queued by close() to wake the worker and make it exit.
+_STOP = object()
+
+
+class QueryBatcher:
+    """Coalesce concurrent `submit` calls into batched `search_fn` calls."""
+
+    def __init__(self, search_fn: SearchFn, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.search_fn = search_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._queries = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, question: str) -> Any:
+        """Block until the batch containing `question` is searched; return its result."""
+        if self._closed:
+            raise RuntimeError("QueryBatcher is closed.")
+        fut: Future = Future()
+        self._queue.put((question, fut, time.perf_counter()))
+        return fut.result()
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        """Stop the worker thread; queries already queued are answered first."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+
+    def _collect(self) -> Tuple[List[Tuple[str, Future, float]], bool]:
+        """Next batch, plus whether close() was requested while collecting it."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    # Window closed; still take anything already queued.
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            batch, stop = self._collect()
+            if batch:
+                self._dispatch(batch)
+            if stop:
+                break
+        # Anything submitted concurrently with close() must not wait forever.
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                item[1].set_exception(RuntimeError("QueryBatcher is closed."))
+
+    def _dispatch(self, batch: List[Tuple[str, Future, float]]) -> None:
+        dispatched = time.perf_counter()
+        try:
+            results = list(self.search_fn([q for q, _, _ in batch]))
+            if len(results) != len(batch):
+                # Results are matched to callers by position, so any mismatch makes them untrustworthy.
+                raise RuntimeError(
+                    f"search_fn returned {len(results)} results for a batch of {len(batch)}."
+                )
+        except Exception as exc:
+            for _, fut, _ in batch:
+                fut.set_exception(exc)
+        else:
+            for (_, fut, _), result in zip(batch, results):
+                fut.set_result(result)
+        self._record(len(batch), [dispatched - t for _, _, t in batch])
+
+    def _record(self, size: int, waits: List[float]) -> None:
+        metrics.observe("rag_query_batch_size", size, buckets=metrics.BATCH_SIZE_BUCKETS)
+        with self._stats_lock:
+            self._batch_sizes[size] += 1
+            self._queries += size
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self) -> Dict[str, Any]:
+        """Achieved batch sizes and the queueing delay batching added per query."""
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                "batches": batches,
+                "queries": self._queries,
+                "mean_batch_size": self._queries / batches if batches else 0.0,
+                "max_batch_size": max(self._batch_sizes, default=0),
+                "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+                "mean_added_latency_ms": 1000 * self._wait_total / self._queries if self._queries else 0.0,
+                "max_added_latency_ms": 1000 * self._wait_max,
+            }
+
+
+__all__ = ["QueryBatcher"]
@@ -5,20 +5,36 @@ Flow:
     user question -> embed -> FAISS search -> top-k chunks -> merged context_text
 """
 
+import os
 from pathlib import Path
 import sys
-from typing import List, Tuple, Dict, Any
+import threading
+from typing import List, NamedTuple, Optional, Sequence, Tuple, Dict, Any
 
 import numpy as np
 import pandas as pd
 import faiss
 from sentence_transformers import SentenceTransformer
 
+from . import metrics
+from .generations import INDEX_PATH_PINNED, VECTOR_DB_DIR, current_generation, generation_paths
+from .query_batcher import QueryBatcher
+from .sharded_index import ShardedIndex, is_shard_dir
+
 # Paths reuse existing artifacts produced in earlier phases.
 EMBED_PATH = Path("vector_db/embeddings.npy")
 META_PATH = Path("vector_db/meta_chunks.csv")
-INDEX_PATH = Path("vector_db/faiss_index/index.faiss")
+# May point at a sharded index directory (see sharded_index.py) instead of a single file.
+# Setting it explicitly takes precedence over published generations (vector_db/CURRENT).
+INDEX_PATH = Path(os.getenv("RAG_INDEX_PATH", "vector_db/faiss_index/index.faiss"))
+# Comma-separated host:port per shard to search shard processes instead of local shards.
+SHARD_ADDRESSES = [a for a in os.getenv("RAG_SHARD_ADDRESSES", "").split(",") if a.strip()]
 MODEL_NAME = "all-MiniLM-L6-v2"
+# Micro-batching of concurrent queries; a max batch size of 1 disables it. Off by default:
+# a sync worker has one query in flight, so it would only add the wait and a thread hop.
+# The ASGI app turns it on (see app/asgi.py); set it for threaded servers too.
+BATCH_MAX_SIZE = int(os.getenv("RAG_BATCH_MAX_SIZE", "1"))
+BATCH_MAX_WAIT_MS = float(os.getenv("RAG_BATCH_MAX_WAIT_MS", "2"))
 
 
 def _load_index(index_path: Path = INDEX_PATH) -> faiss.Index:
@@ -26,6 +42,8 @@ def _load_index(index_path: Path = INDEX_PATH) -> faiss.Index:
         raise FileNotFoundError(
             f"FAISS index not found at {index_path}. Build it via vector_store.build_index()."
         )
+    if is_shard_dir(index_path):
+        return ShardedIndex.load(index_path, SHARD_ADDRESSES)
     return faiss.read_index(str(index_path))
 
 
@@ -37,6 +55,14 @@ def _load_meta(meta_path: Path = META_PATH) -> pd.DataFrame:
     return pd.read_csv(meta_path)
 
 
+class IndexSnapshot(NamedTuple):
+    """Index + metadata that must always be used together (one generation)."""
+
+    index: faiss.Index
+    meta: pd.DataFrame
+    generation: Optional[str]
+
+
 class RagPipeline:
     """Lightweight retriever that returns concatenated context (no LLM)."""
 
@@ -46,30 +72,158 @@ class RagPipeline:
         index_path: Path = INDEX_PATH,
         meta_path: Path = META_PATH,
         top_k: int = 5,
+        batch_max_size: int = BATCH_MAX_SIZE,
+        batch_max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        model: SentenceTransformer | None = None,
+        index: faiss.Index | None = None,
+        meta: pd.DataFrame | None = None,
+        generation: str | None = None,
     ):
-        self.model = SentenceTransformer(model_name)
-        self.index = _load_index(index_path)
-        self.meta = _load_meta(meta_path)
+        # Already-loaded components (e.g. from benchmarks) skip the corresponding disk/model load.
+        self.model = model if model is not None else SentenceTransformer(model_name)
+        # Requests read the snapshot once and use it throughout, so a reload that swaps
+        # it mid-request never pairs one generation's ids with another's metadata.
+        self._snapshot = IndexSnapshot(
+            index if index is not None else _load_index(index_path),
+            meta if meta is not None else _load_meta(meta_path),
+            generation,
+        )
+        self._reload_lock = threading.Lock()
         self.top_k = top_k
+        self.batcher = (
+            QueryBatcher(self._search_batch, batch_max_size, batch_max_wait_ms)
+            if batch_max_size > 1
+            else None
+        )
+
+    @property
+    def index(self) -> faiss.Index:
+        return self._snapshot.index
+
+    @property
+    def meta(self) -> pd.DataFrame:
+        return self._snapshot.meta
+
+    @property
+    def generation(self) -> Optional[str]:
+        return self._snapshot.generation
+
+    def reload(self, index_path: Path, meta_path: Path, generation: str | None = None) -> Optional[str]:
+        """
+        Load a new index + metadata and swap them in; the model is reused.
+
+        Loading happens on the calling thread while requests keep using the old
+        snapshot; in-flight requests finish on whichever snapshot they started with.
+        """
+        with self._reload_lock:
+            return self._reload_locked(index_path, meta_path, generation)
+
+    def reload_latest(self, root: Path = VECTOR_DB_DIR) -> Optional[str]:
+        """Reload if CURRENT names a generation other than the one being served."""
+        if INDEX_PATH_PINNED:
+            return None
+        with self._reload_lock:
+            generation = current_generation(root)
+            if generation is None or generation == self.generation:
+                return None
+            index_path, meta_path = generation_paths(generation, root)
+            return self._reload_locked(index_path, meta_path, generation)
+
+    def _reload_locked(self, index_path: Path, meta_path: Path, generation: str | None) -> Optional[str]:
+        try:
+            index = _load_index(index_path)
+            meta = _load_meta(meta_path)
+            if index.d != self.index.d:
+                raise ValueError(
+                    f"Index dimension {index.d} does not match the serving index ({self.index.d}); "
+                    "was it built with a different model?"
+                )
+            if index.ntotal != len(meta):
+                raise ValueError(f"Index has {index.ntotal} vectors but metadata has {len(meta)} rows.")
+        except Exception:
+            metrics.inc("rag_reloads_total", result="error")
+            raise
+        self._snapshot = IndexSnapshot(index, meta, generation)
+        metrics.inc("rag_reloads_total", result="ok")
+        print(f"Reloaded index generation {generation} ({index.ntotal} vectors)")
+        return generation
+
+    def encode(self, questions: Sequence[str]) -> np.ndarray:
+        """Embed questions as L2-normalized float32 rows (cosine via inner product)."""
+        with metrics.timed("encode"):
+            vecs = self.model.encode(list(questions), batch_size=max(len(questions), 1))
+            vecs = np.array(vecs, dtype=np.float32)
+            faiss.normalize_L2(vecs)
+        return vecs
+
+    def search_vectors(
+        self, vecs: np.ndarray, snapshot: IndexSnapshot | None = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k search for already-encoded query vectors."""
+        snapshot = snapshot or self._snapshot
+        with metrics.timed("search"):
+            return snapshot.index.search(vecs, self.top_k)
+
+    def _search_batch(
+        self, questions: Sequence[str]
+    ) -> List[Tuple[np.ndarray, np.ndarray, IndexSnapshot, Dict[str, float]]]:
+        """
+        Encode and search a batch of questions in one pass.
+
+        Returns one (scores, idxs, snapshot, stage_ms) per question, where stage_ms holds
+        the batch's encode/search milliseconds. This may run on the batcher thread, outside
+        the caller's timings context, so callers credit stage_ms themselves.
+        """
+        snapshot = self._snapshot
+        with metrics.collect_timings() as stage_ms:
+            scores, idxs = self.search_vectors(self.encode(questions), snapshot)
+        return [(scores[i], idxs[i], snapshot, stage_ms) for i in range(len(questions))]
+
+    def build_hits(
+        self, scores: np.ndarray, idxs: np.ndarray, snapshot: IndexSnapshot | None = None
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """Materialize one query's search row into metadata hits and merged context."""
+        meta = (snapshot or self._snapshot).meta
+        with metrics.timed("hits"):
+            hits = []
+            for score, idx in zip(scores, idxs):
+                if idx == -1 or idx >= len(meta):
+                    continue
+                row = meta.iloc[int(idx)].to_dict()
+                row["score"] = float(score)
+                hits.append(row)
+
+        with metrics.timed("context"):
+            context_text = "\n\n".join(hit["chunk_text"] for hit in hits if "chunk_text" in hit)
+        return context_text, hits
 
     def retrieve(self, question: str) -> Tuple[str, List[Dict[str, Any]]]:
         """Return merged context text and per-hit metadata with scores."""
-        vec = self.model.encode([question])
-        vec = np.array(vec, dtype=np.float32)
-        faiss.normalize_L2(vec)
-
-        scores, idxs = self.index.search(vec, self.top_k)
-
-        hits = []
-        for score, idx in zip(scores[0], idxs[0]):
-            if idx == -1 or idx >= len(self.meta):
-                continue
-            row = self.meta.iloc[int(idx)].to_dict()
-            row["score"] = float(score)
-            hits.append(row)
-
-        context_text = "\n\n".join(hit["chunk_text"] for hit in hits if "chunk_text" in hit)
-        return context_text, hits
+        if self.batcher is not None:
+            # Covers queueing plus the shared batch, so it includes the encode/search below.
+            with metrics.timed("batch_wait"):
+                scores, idxs, snapshot, stage_ms = self.batcher.submit(question)
+        else:
+            scores, idxs, snapshot, stage_ms = self._search_batch([question])[0]
+        metrics.add_timings(stage_ms)
+        return self.build_hits(scores, idxs, snapshot)
+
+    def retrieve_many(self, questions: Sequence[str]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        """Batch variant of retrieve for callers that already hold several questions."""
+        if not questions:
+            return []
+        results = self._search_batch(questions)
+        metrics.add_timings(results[0][3])
+        return [self.build_hits(scores, idxs, snapshot) for scores, idxs, snapshot, _ in results]
+
+    def close(self) -> None:
+        """Stop the micro-batching thread; the pipeline must not be used afterwards."""
+        if self.batcher is not None:
+            self.batcher.close()
+
+    def batch_stats(self) -> Dict[str, Any]:
+        """Achieved batch sizes and added latency from micro-batching (empty when disabled)."""
+        return self.batcher.stats() if self.batcher is not None else {}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,8 @@
+"""Sample career queries shared by the eval, benchmark and load-test tools (no heavy imports)."""
+
+DEFAULT_QUERIES = [
+    "senior backend engineer python aws",
+    "frontend react typescript remote",
+    "data scientist machine learning",
+    "devops kubernetes terraform",
+]
@@ -8,6 +8,8 @@ import pandas as pd
 import requests
 from bs4 import BeautifulSoup
 
+from .io_utils import atomic_write
+
 
 BASE_WEWORK_URL = "https://weworkremotely.com/remote-jobs"
 # Second vetted source (Remotive lists remote roles with API/HTML allowed for scraping per robots.txt)
@@ -299,7 +301,7 @@ class JobScraper:
         return tags
 
 
-def run_scraper(output_path: str = RAW_DATA_PATH, target_count: int = 300):
+def run_scraper(output_path: str = RAW_DATA_PATH, target_count: int = 300) -> pd.DataFrame:
     """Entrypoint to run from CLI."""
     scraper = JobScraper()
     ww_jobs = scraper.fetch_weworkremotely(limit=target_count)
@@ -312,8 +314,10 @@ def run_scraper(output_path: str = RAW_DATA_PATH, target_count: int = 300):
     data = [asdict(job) for job in jobs]
     df = pd.DataFrame(data)
     output_path = output_path or RAW_DATA_PATH
-    df.to_csv(output_path, index=False)
+    with atomic_write(output_path) as tmp:
+        df.to_csv(tmp, index=False)
     print(f"Saved to {output_path}")
+    return df
 
 
 if __name__ == "__main__":
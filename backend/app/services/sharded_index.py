@@ -0,0 +1,407 @@
+"""
+Sharded FAISS index with scatter-gather search.
+
+Usage:
+    # Split vector_db/embeddings.npy into 4 shards by hash of chunk_id and build them in parallel
+    python -m app.services.sharded_index build --shards 4 --out vector_db/shards
+
+    # Serve one shard from its own process over a local RPC socket (clients need the same key)
+    RAG_SHARD_AUTHKEY=<secret> python -m app.services.sharded_index serve vector_db/shards --shard 0 --port 7100
+
+    # Latency / build-time scaling vs shard count on a synthetic corpus
+    python -m app.services.sharded_index bench --synthetic 1000000 --shards 1 2 4 8
+
+Serving:
+    Point RAG_INDEX_PATH at the shard directory; RagPipeline then searches every shard
+    concurrently (threads) and merges the per-shard top-k. Set RAG_SHARD_ADDRESSES to
+    "host:port,..." (one per shard, in shard order) to search shard processes instead;
+    RAG_SHARD_AUTHKEY must then be set to the same secret in the server and every shard.
+    An explicit RAG_INDEX_PATH takes precedence over vector_db/CURRENT, whose generations
+    only hold single-file indexes; rebuild the shards and restart to roll out a new index.
+
+Layout of a shard directory:
+    manifest.json                  # shard count, partitioning, dim, rows per shard
+    shard_<i>/embeddings.npy       # that shard's vectors
+    shard_<i>/ids.npy              # global row ids (positions in meta_chunks.csv)
+    shard_<i>/index.faiss          # built with vector_store.build_index
+
+Metadata stays in one table in the serving process; shards only return global row ids.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+import pandas as pd
+
+from .bench_utils import exact_top_k, generate_synthetic_corpus, percentiles, recall_at_k, synthetic_queries
+
+EMBED_PATH = Path("vector_db/embeddings.npy")
+META_PATH = Path("vector_db/meta_chunks.csv")
+SHARD_DIR = Path("vector_db/shards")
+MANIFEST_FILENAME = "manifest.json"
+
+
+def assign_shards(meta: pd.DataFrame, num_shards: int, shard_by: str = "chunk_id") -> np.ndarray:
+    """
+    Shard number for every metadata row.
+
+    Rows are hashed on `shard_by` with crc32 (stable across processes, unlike hash()).
+    Hashing chunk_id spreads rows evenly; hashing a column such as `source` keeps each
+    source's chunks on one shard, but needs at least as many distinct values as shards.
+    """
+    if shard_by not in meta:
+        raise ValueError(f"Cannot shard by {shard_by!r}: column not in metadata.")
+    keys = meta[shard_by].fillna("").astype(str)
+    return np.fromiter(
+        (zlib.crc32(k.encode("utf-8")) % num_shards for k in keys), dtype=np.int64, count=len(keys)
+    )
+
+
+def _require_authkey() -> bytes:
+    # multiprocessing.connection unpickles whatever an authenticated peer sends, so the
+    # shared key is all that stands between the port and code execution: no default.
+    authkey = os.getenv("RAG_SHARD_AUTHKEY")
+    if not authkey:
+        raise RuntimeError("RAG_SHARD_AUTHKEY not set in environment.")
+    return authkey.encode("utf-8")
+
+
+def _build_shard(embed_path: str, index_path: str) -> int:
+    # Top-level so ProcessPoolExecutor can pickle it.
+    from .vector_store import build_index
+    return int(build_index(Path(embed_path), Path(index_path)).ntotal)
+
+
+def build_sharded_index(
+    embed_path: Path = EMBED_PATH,
+    meta_path: Path = META_PATH,
+    out_dir: Path = SHARD_DIR,
+    num_shards: int = 4,
+    shard_by: str = "chunk_id",
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Partition embeddings into shards and build each shard's index in parallel processes.
+
+    Everything is built in a staging directory next to `out_dir` that replaces it only
+    once complete, so a rebuild never leaves an old manifest over new shards or stale
+    shard_<i> directories from a larger shard count.
+    """
+    vectors = np.load(embed_path, mmap_mode="r")
+    meta = pd.read_csv(meta_path)
+    if len(meta) != len(vectors):
+        raise ValueError(f"{embed_path} has {len(vectors)} rows but {meta_path} has {len(meta)}.")
+
+    out_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging = out_dir.parent / f".{out_dir.name}.tmp{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir()
+    try:
+        start = time.perf_counter()
+        assignment = assign_shards(meta, num_shards, shard_by)
+        counts = np.bincount(assignment, minlength=num_shards)
+        if (counts == 0).any():
+            empty = [int(i) for i in np.flatnonzero(counts == 0)]
+            raise ValueError(
+                f"Shards {empty} would be empty ({shard_by!r} has too few distinct values for "
+                f"{num_shards} shards); use fewer shards or a different --by column."
+            )
+        jobs = []
+        rows = []
+        for shard in range(num_shards):
+            shard_dir = staging / f"shard_{shard}"
+            shard_dir.mkdir()
+            ids = np.flatnonzero(assignment == shard)
+            np.save(shard_dir / "ids.npy", ids)
+            np.save(shard_dir / "embeddings.npy", np.ascontiguousarray(vectors[ids], dtype=np.float32))
+            jobs.append((str(shard_dir / "embeddings.npy"), str(shard_dir / "index.faiss")))
+            rows.append(int(len(ids)))
+        partition_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers or min(num_shards, os.cpu_count() or 1)) as pool:
+            list(pool.map(_build_shard, *zip(*jobs)))
+        build_s = time.perf_counter() - start
+
+        manifest = {
+            "num_shards": num_shards,
+            "shard_by": shard_by,
+            "dim": int(vectors.shape[1]),
+            "rows": rows,
+            "total_rows": int(len(vectors)),
+        }
+        (staging / MANIFEST_FILENAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+        # Two renames: the previous build is moved aside, then the new one takes its name.
+        # Loaded shards live in memory, so swapping the files under a running server is safe.
+        previous = out_dir.parent / f".{out_dir.name}.old{os.getpid()}"
+        if out_dir.exists():
+            out_dir.rename(previous)
+        staging.rename(out_dir)
+        shutil.rmtree(previous, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    print(
+        f"Built {num_shards} shards in {out_dir} "
+        f"(partition {partition_s:.2f}s, index build {build_s:.2f}s, rows per shard {rows})"
+    )
+    return dict(manifest, partition_s=partition_s, build_s=build_s)
+
+
+class LocalShard:
+    """One shard's index in this process, translating local positions to global row ids."""
+
+    def __init__(self, index: faiss.Index, ids: np.ndarray):
+        self.index = index
+        self.ids = np.asarray(ids, dtype=np.int64)
+
+    @classmethod
+    def load(cls, shard_dir: Path) -> "LocalShard":
+        return cls(faiss.read_index(str(shard_dir / "index.faiss")), np.load(shard_dir / "ids.npy"))
+
+    def search(self, vecs: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores, local = self.index.search(vecs, k)
+        if len(self.ids) == 0:
+            return scores, np.full_like(local, -1)
+        # np.where evaluates both branches, so the -1 padding must still index safely.
+        global_ids = np.where(local >= 0, self.ids.take(local, mode="clip"), -1)
+        return scores, global_ids
+
+
+class RemoteShard:
+    """Client for a shard served by `serve_shard`; keeps a small pool of connections."""
+
+    def __init__(self, address: Tuple[str, int], authkey: Optional[bytes] = None):
+        self.address = address
+        self.authkey = authkey or _require_authkey()
+        self._idle: "queue.SimpleQueue" = queue.SimpleQueue()
+
+    def _call(self, *request: Any) -> Any:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = Client(self.address, authkey=self.authkey)
+        try:
+            conn.send(request)
+            status, payload = conn.recv()
+        except Exception:
+            conn.close()
+            raise
+        self._idle.put(conn)
+        if status != "ok":
+            raise RuntimeError(f"Shard {self.address[0]}:{self.address[1]} failed: {payload}")
+        return payload
+
+    def info(self) -> Dict[str, int]:
+        return self._call("info")
+
+    def search(self, vecs: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self._call("search", vecs, k)
+
+
+def serve_shard(
+    shard_dir: Path, host: str = "127.0.0.1", port: int = 7100, authkey: Optional[bytes] = None
+) -> None:
+    """Serve one shard's search over multiprocessing.connection until interrupted."""
+    authkey = authkey or _require_authkey()
+    shard = LocalShard.load(shard_dir)
+    listener = Listener((host, port), authkey=authkey)
+    print(f"Serving {shard_dir} ({shard.index.ntotal} vectors) on {host}:{port}")
+
+    def handle(conn) -> None:
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if request[0] == "search":
+                        conn.send(("ok", shard.search(request[1], request[2])))
+                    elif request[0] == "info":
+                        conn.send(("ok", {"d": shard.index.d, "ntotal": shard.index.ntotal}))
+                    else:
+                        conn.send(("error", f"unknown request {request[0]!r}"))
+                except Exception as exc:
+                    conn.send(("error", str(exc)))
+
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception as exc:  # failed handshake (bad authkey etc.); keep serving
+            print(f"Rejected shard connection: {exc}")
+            continue
+        threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+def merge_topk(
+    results: Sequence[Tuple[np.ndarray, np.ndarray]], k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge per-shard (scores, ids) into the global top-k by descending inner product."""
+    scores = np.concatenate([s for s, _ in results], axis=1)
+    ids = np.concatenate([i for _, i in results], axis=1)
+    scores = np.where(ids >= 0, scores, -np.inf)
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    top_scores = np.take_along_axis(scores, order, axis=1)
+    top_ids = np.take_along_axis(ids, order, axis=1)
+    top_ids[~np.isfinite(top_scores)] = -1
+    return top_scores.astype(np.float32), top_ids
+
+
+class ShardedIndex:
+    """
+    Drop-in for the faiss.Index calls RagPipeline makes (`search`, `d`, `ntotal`).
+
+    A search is scattered to every shard concurrently; faiss and the RPC socket both
+    release the GIL, so threads are enough to overlap them.
+    """
+
+    def __init__(self, shards: Sequence[Any], d: int, ntotal: int):
+        self.shards = list(shards)
+        self.d = d
+        self.ntotal = ntotal
+        self._pool = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="shard")
+
+    @classmethod
+    def load(cls, shard_dir: Path, addresses: Optional[Sequence[str]] = None) -> "ShardedIndex":
+        manifest = json.loads((shard_dir / MANIFEST_FILENAME).read_text(encoding="utf-8"))
+        if addresses:
+            if len(addresses) != manifest["num_shards"]:
+                raise ValueError(
+                    f"{len(addresses)} shard addresses given for {manifest['num_shards']} shards."
+                )
+            shards = [RemoteShard(_parse_address(a)) for a in addresses]
+            for shard in shards:
+                # Fail at load time, not on the first query, if a shard process is wrong or down.
+                if shard.info()["d"] != manifest["dim"]:
+                    raise ValueError(f"Shard at {shard.address} does not match dim {manifest['dim']}.")
+        else:
+            shards = [LocalShard.load(shard_dir / f"shard_{i}") for i in range(manifest["num_shards"])]
+        return cls(shards, manifest["dim"], manifest["total_rows"])
+
+    def search(self, vecs: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if len(self.shards) == 1:
+            return self.shards[0].search(vecs, k)
+        futures = [self._pool.submit(shard.search, vecs, k) for shard in self.shards]
+        return merge_topk([f.result() for f in futures], k)
+
+
+def _parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.strip().rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def is_shard_dir(path: Path) -> bool:
+    return path.is_dir() and (path / MANIFEST_FILENAME).exists()
+
+
+def run_scaling_bench(
+    n: int,
+    shard_counts: Sequence[int],
+    dim: int = 384,
+    num_queries: int = 200,
+    top_k: int = 5,
+) -> List[Dict[str, Any]]:
+    """Build + query the same synthetic corpus at each shard count; report build time and latency."""
+    vectors, meta = generate_synthetic_corpus(n, dim=dim)
+    queries = synthetic_queries(vectors, num_queries)
+    truth_ids = exact_top_k(vectors, queries, top_k)
+
+    work = Path(tempfile.mkdtemp(prefix="rag-shards-"))
+    try:
+        np.save(work / "embeddings.npy", vectors)
+        meta.to_csv(work / "meta_chunks.csv", index=False)
+        del vectors
+
+        rows = []
+        for count in shard_counts:
+            out = work / f"s{count}"
+            built = build_sharded_index(work / "embeddings.npy", work / "meta_chunks.csv", out, num_shards=count)
+            index = ShardedIndex.load(out)
+            index.search(queries[:1], top_k)  # warm-up
+            latencies = []
+            found = np.empty_like(truth_ids)
+            for i in range(num_queries):
+                start = time.perf_counter()
+                _, ids = index.search(queries[i : i + 1], top_k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found[i] = ids[0]
+            rows.append(
+                {
+                    "shards": count,
+                    "partition_s": built["partition_s"],
+                    "build_s": built["build_s"],
+                    "recall_at_k": recall_at_k(found, truth_ids),
+                    **percentiles(latencies),
+                }
+            )
+            shutil.rmtree(out, ignore_errors=True)
+        return rows
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Sharded FAISS index tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="partition embeddings and build shard indexes")
+    build.add_argument("--shards", type=int, default=4)
+    build.add_argument("--by", default="chunk_id", help="metadata column hashed to pick a shard")
+    build.add_argument("--embed-path", type=Path, default=EMBED_PATH)
+    build.add_argument("--meta-path", type=Path, default=META_PATH)
+    build.add_argument("--out", type=Path, default=SHARD_DIR)
+    build.add_argument("--workers", type=int, default=None)
+
+    serve = sub.add_parser("serve", help="serve one shard over local RPC")
+    serve.add_argument("shard_dir", type=Path)
+    serve.add_argument("--shard", type=int, required=True)
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, required=True)
+
+    bench = sub.add_parser("bench", help="latency/build-time scaling vs shard count")
+    bench.add_argument("--synthetic", type=int, default=1_000_000)
+    bench.add_argument("--dim", type=int, default=384)
+    bench.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    bench.add_argument("--num-queries", type=int, default=200)
+    bench.add_argument("--top-k", type=int, default=5)
+    bench.add_argument("--out", default=None, help="write JSON results here")
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        build_sharded_index(args.embed_path, args.meta_path, args.out, args.shards, args.by, args.workers)
+    elif args.command == "serve":
+        serve_shard(args.shard_dir / f"shard_{args.shard}", args.host, args.port)
+    else:
+        rows = run_scaling_bench(args.synthetic, args.shards, args.dim, args.num_queries, args.top_k)
+        print(f"\n{args.synthetic} vectors x {args.dim}, top_k {args.top_k}, {args.num_queries} queries")
+        print(f"{'shards':>6} {'split_s':>8} {'build_s':>8} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'recall':>7}")
+        for r in rows:
+            print(
+                f"{r['shards']:>6} {r['partition_s']:>8.2f} {r['build_s']:>8.2f} {r['p50']:>8.3f} {r['p95']:>8.3f} "
+                f"{r['p99']:>8.3f} {r['recall_at_k']:>7.4f}"
+            )
+        if args.out:
+            Path(args.out).write_text(json.dumps(rows, indent=2), encoding="utf-8")
+            print(f"Saved results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
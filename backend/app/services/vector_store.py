@@ -4,7 +4,8 @@ from typing import List, Tuple
 import faiss
 import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer
+
+from .io_utils import atomic_write
 
 EMBED_PATH = Path("vector_db/embeddings.npy")
 META_PATH = Path("vector_db/meta_chunks.csv")
@@ -26,8 +27,8 @@ def build_index(
     index = faiss.IndexFlatIP(dim)
     index.add(vectors)
 
-    index_path.parent.mkdir(parents=True, exist_ok=True)
-    faiss.write_index(index, str(index_path))
+    with atomic_write(index_path) as tmp:
+        faiss.write_index(index, str(tmp))
     print(f"FAISS index saved to {index_path} (vectors: {vectors.shape[0]}, dim: {dim})")
     return index
 
@@ -45,6 +46,9 @@ def similarity_search(
     index_path: Path = INDEX_PATH,
     model_name: str = "all-MiniLM-L6-v2",
 ) -> List[Tuple[float, dict]]:
+    # Imported here so index-only callers (e.g. parallel shard builds) skip loading torch.
+    from sentence_transformers import SentenceTransformer
+
     meta = pd.read_csv(meta_path)
     index = load_index(index_path)
     model = SentenceTransformer(model_name)